@@ -0,0 +1,107 @@
+"""
+Startup benchmark for Meli SAT Manager
+
+Measures, in fresh processes:
+1. How long `import main` takes and whether the heavy data libraries
+   (pandas, openpyxl) were loaded by it
+2. How long it takes from launching uvicorn until /health answers
+
+Usage:
+    python benchmark_startup.py [--runs 5] [--port 8765]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'import_seconds': elapsed,
+    'pandas_loaded': 'pandas' in sys.modules,
+    'openpyxl_loaded': 'openpyxl' in sys.modules
+}))
+"""
+
+
+def measure_import() -> dict:
+    """
+    Time `import main` in a fresh interpreter
+
+    Returns:
+        Dict with import_seconds and which heavy modules were loaded
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure_health(port: int, timeout: float = 30.0) -> float:
+    """
+    Time from launching uvicorn until /health returns 200
+
+    Args:
+        port: Port for the server
+        timeout: Maximum seconds to wait
+
+    Returns:
+        Seconds until the first successful health check
+    """
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {process.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        raise TimeoutError(f"/health did not respond within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure Meli SAT Manager cold start")
+    parser.add_argument("--runs", type=int, default=5, help="Number of runs")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the health check run")
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    imports = [measure_import() for _ in range(args.runs)]
+    health = [measure_health(args.port) for _ in range(args.runs)]
+
+    import_times = [run['import_seconds'] for run in imports]
+    print(f"import main:       median {statistics.median(import_times) * 1000:.1f} ms "
+          f"(min {min(import_times) * 1000:.1f} ms)")
+    print(f"pandas loaded:     {any(run['pandas_loaded'] for run in imports)}")
+    print(f"openpyxl loaded:   {any(run['openpyxl_loaded'] for run in imports)}")
+    print(f"first /health 200: median {statistics.median(health) * 1000:.1f} ms "
+          f"(min {min(health) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
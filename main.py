@@ -1,14 +1,21 @@
 """
 Main FastAPI application for Meli SAT Manager
 """
+import json
 import os
+import uuid
+from functools import lru_cache, wraps
 from pathlib import Path
-from fastapi import FastAPI, Request, UploadFile, File, HTTPException
+from typing import Optional
+from fastapi import FastAPI, Request, UploadFile, File, HTTPException, Header
 from fastapi.responses import HTMLResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from services import MeliClient, FileManager
-from utils import logger, log_update, format_error_response, format_success_response
+from utils import (
+    logger, log_update, format_error_response, format_success_response,
+    stage_timer, timed_stage, timing_report, request_profiler
+)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -24,14 +31,68 @@ templates = Jinja2Templates(directory="templates")
 if os.path.exists("static"):
     app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Initialize clients
-try:
-    meli_client = MeliClient()
-    file_manager = FileManager()
-    logger.info("Meli SAT Manager initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize: {e}")
-    raise
+# Initialize clients. The MercadoLibre client is built on first use so the
+# app (and /health) can start even when .env is not configured yet.
+file_manager = FileManager()
+
+
+@lru_cache(maxsize=1)
+def get_meli_client() -> MeliClient:
+    """
+    Get the shared MercadoLibre client, creating it on first use
+    
+    Returns:
+        MeliClient instance
+    
+    Raises:
+        HTTPException: 503 if ACCESS_TOKEN or USER_ID are not configured
+    """
+    try:
+        client = MeliClient()
+    except ValueError as e:
+        logger.error(f"Failed to initialize MercadoLibre client: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    logger.info("MercadoLibre client initialized successfully")
+    return client
+
+
+def timing_requested(timing: bool, x_timing: Optional[str]) -> bool:
+    """
+    Check whether the client asked for a stage timing report
+    
+    Args:
+        timing: Value of the ?timing= query flag
+        x_timing: Value of the X-Timing header
+    
+    Returns:
+        True if the timing report should be returned
+    """
+    return timing or (x_timing or "").strip().lower() in ("1", "true", "yes")
+
+
+def timed_endpoint(label: str):
+    """
+    Decorator that collects stage timings for an endpoint and, when the
+    endpoint is called with profile=True, captures a cProfile dump
+    
+    The report is read inside the endpoint with timing_report().
+    
+    Args:
+        label: Label used for the profile file name
+    
+    Returns:
+        Decorator
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with stage_timer() as report, \
+                    request_profiler(kwargs.get('profile', False), label) as profile_file:
+                report['profile_file'] = profile_file
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -43,17 +104,29 @@ async def index(request: Request):
 
 
 @app.post("/download")
-async def download_publications(format: str = "xlsx"):
+@timed_endpoint("download")
+async def download_publications(
+    format: str = "xlsx",
+    timing: bool = False,
+    profile: bool = False,
+    x_timing: Optional[str] = Header(default=None)
+):
     """
     Download all publications with SAT fields
     
     Args:
         format: File format (xlsx or csv)
+        timing: Return a per-stage timing report in the X-Stage-Timings header
+        profile: Write a cProfile dump of this request to PROFILE_DIR
+            (requires ENABLE_PROFILING)
+        x_timing: Alternative to the timing flag via the X-Timing header
     
     Returns:
         File download response
     """
     try:
+        meli_client = get_meli_client()
+        
         logger.info(f"Starting download process in {format} format")
         
         # Validate format
@@ -89,11 +162,16 @@ async def download_publications(format: str = "xlsx"):
         
         logger.info(f"File created successfully: {filepath}")
         
+        headers = {}
+        if timing_requested(timing, x_timing):
+            headers['X-Stage-Timings'] = json.dumps(timing_report())
+        
         # Return file download
         return FileResponse(
             path=filepath,
             filename=filename,
-            media_type="application/octet-stream"
+            media_type="application/octet-stream",
+            headers=headers
         )
     
     except PermissionError as e:
@@ -107,17 +185,31 @@ async def download_publications(format: str = "xlsx"):
 
 
 @app.post("/upload")
-async def upload_sat_fields(file: UploadFile = File(...)):
+@timed_endpoint("upload")
+async def upload_sat_fields(
+    file: UploadFile = File(...),
+    timing: bool = False,
+    profile: bool = False,
+    x_timing: Optional[str] = Header(default=None)
+):
     """
     Upload and update SAT fields from CSV or XLSX file
     
     Args:
         file: Uploaded file (CSV or XLSX)
+        timing: Include a per-stage timing report in the response data
+        profile: Write a cProfile dump of this request to PROFILE_DIR
+            (requires ENABLE_PROFILING)
+        x_timing: Alternative to the timing flag via the X-Timing header
     
     Returns:
         JSON response with update results
     """
+    temp_path = None
+    
     try:
+        meli_client = get_meli_client()
+        
         logger.info(f"Received file upload: {file.filename}")
         
         # Validate file extension
@@ -130,9 +222,10 @@ async def upload_sat_fields(file: UploadFile = File(...)):
         # Save uploaded file temporarily
         temp_path = os.path.join("/tmp", file.filename)
         
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        with timed_stage("save_upload"):
+            with open(temp_path, "wb") as buffer:
+                content = await file.read()
+                buffer.write(content)
         
         logger.info(f"File saved to {temp_path}")
         
@@ -148,23 +241,39 @@ async def upload_sat_fields(file: UploadFile = File(...)):
                 detail="No valid updates found in the file. Please check the file format."
             )
         
-        logger.info(f"Found {len(updates)} items to update")
+        # Coalesce rows into one write per item before any network call
+        run_id = uuid.uuid4().hex
+        plans = file_manager.plan_sat_updates(updates, run_id=run_id)
+        
+        logger.info(f"Found {len(plans)} items to update ({len(updates)} rows)")
         
         # Process updates
         results = {
-            'total_processed': len(updates),
+            'run_id': run_id,
+            'total_rows': len(updates),
+            'total_processed': len(plans),
             'successful': 0,
             'failed': 0,
+            'conflicts': [],
             'logs': []
         }
         
-        for update in updates:
-            item_id = update['item_id']
-            sat_data = update['sat_data']
+        for plan in plans:
+            item_id = plan['item_id']
+            sat_data = plan['sat_data']
+            
+            if plan['conflicts']:
+                results['conflicts'].append({
+                    'item_id': item_id,
+                    'rows': plan['rows'],
+                    'conflicts': plan['conflicts']
+                })
             
             try:
                 # Update the item
-                meli_client.update_item_sat_fields(item_id, sat_data)
+                meli_client.update_item_sat_fields(
+                    item_id, sat_data, idempotency_key=plan['idempotency_key']
+                )
                 results['successful'] += 1
                 log_entry = log_update(item_id, 'success', 'SAT fields updated')
                 results['logs'].append(log_entry)
@@ -175,16 +284,17 @@ async def upload_sat_fields(file: UploadFile = File(...)):
                 log_entry = log_update(item_id, 'error', error_msg)
                 results['logs'].append(log_entry)
         
-        # Clean up temp file
-        try:
-            os.remove(temp_path)
-        except:
-            pass
-        
         logger.info(f"Update process completed. Successful: {results['successful']}, Failed: {results['failed']}")
         
+        if timing_requested(timing, x_timing):
+            results['timings'] = timing_report()
+        
+        message = f"Process completed. {results['successful']} items updated successfully, {results['failed']} failed."
+        if results['conflicts']:
+            message += f" {len(results['conflicts'])} items had conflicting rows."
+        
         return format_success_response(
-            message=f"Process completed. {results['successful']} items updated successfully, {results['failed']} failed.",
+            message=message,
             data=results
         )
     
@@ -193,6 +303,14 @@ async def upload_sat_fields(file: UploadFile = File(...)):
     except Exception as e:
         logger.error(f"Error in upload endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    
+    finally:
+        # Clean up temp file
+        if temp_path:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
 
 
 @app.get("/health")
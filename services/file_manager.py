@@ -1,17 +1,50 @@
 """
 File Manager
 Handles reading and writing CSV/XLSX files
+
+pandas (and openpyxl through it) is imported on first use so that starting
+the web app does not pay for loading the data libraries.
 """
+from __future__ import annotations
+
+import hashlib
 import json
-import pandas as pd
-from typing import List, Dict, Any
-from utils import logger
+import math
+from typing import List, Dict, Any, TYPE_CHECKING
+from utils import logger, profile_stage
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def _pd():
+    """
+    Import pandas on first use
+    
+    Returns:
+        The pandas module
+    """
+    import pandas
+    return pandas
+
+
+def _cell_to_str(value: Any) -> str:
+    """
+    Convert a spreadsheet cell to a stripped string
+    
+    Empty cells come back from pandas as NaN (or None); they are returned as ''
+    so they are never mistaken for a real value.
+    """
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    return str(value).strip()
 
 
 class FileManager:
     """Manager for handling CSV and XLSX files"""
     
     @staticmethod
+    @profile_stage('items_to_dataframe')
     def items_to_dataframe(items: List[Dict[str, Any]]) -> pd.DataFrame:
         """
         Convert list of items to a pandas DataFrame with required columns
@@ -22,6 +55,7 @@ class FileManager:
         Returns:
             DataFrame with structured data
         """
+        pd = _pd()
         rows = []
         
         for item in items:
@@ -63,6 +97,7 @@ class FileManager:
         return df
     
     @staticmethod
+    @profile_stage('save_to_excel')
     def save_to_excel(df: pd.DataFrame, filename: str) -> str:
         """
         Save DataFrame to Excel file
@@ -83,6 +118,7 @@ class FileManager:
             raise
     
     @staticmethod
+    @profile_stage('save_to_csv')
     def save_to_csv(df: pd.DataFrame, filename: str) -> str:
         """
         Save DataFrame to CSV file
@@ -103,6 +139,7 @@ class FileManager:
             raise
     
     @staticmethod
+    @profile_stage('read_upload_file')
     def read_upload_file(file_path: str) -> pd.DataFrame:
         """
         Read uploaded CSV or XLSX file
@@ -113,11 +150,15 @@ class FileManager:
         Returns:
             DataFrame with file contents
         """
+        pd = _pd()
+        
         try:
+            # Read every cell as text: a column with blank cells would otherwise
+            # be parsed as float and turn codes like 43211500 into '43211500.0'
             if file_path.endswith('.xlsx'):
-                df = pd.read_excel(file_path, engine='openpyxl')
+                df = pd.read_excel(file_path, engine='openpyxl', dtype=str)
             elif file_path.endswith('.csv'):
-                df = pd.read_csv(file_path, encoding='utf-8-sig')
+                df = pd.read_csv(file_path, encoding='utf-8-sig', dtype=str)
             else:
                 raise ValueError("Unsupported file format. Use CSV or XLSX.")
             
@@ -128,6 +169,7 @@ class FileManager:
             raise
     
     @staticmethod
+    @profile_stage('extract_sat_updates')
     def extract_sat_updates(df: pd.DataFrame) -> List[Dict[str, Any]]:
         """
         Extract SAT field updates from DataFrame
@@ -136,7 +178,8 @@ class FileManager:
             df: DataFrame with item data
         
         Returns:
-            List of dicts with item_id and SAT fields to update
+            List of dicts with item_id, SAT fields to update and row (the
+            spreadsheet row number, counting the header as row 1)
         """
         updates = []
         
@@ -148,18 +191,20 @@ class FileManager:
             raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
         
         for idx, row in df.iterrows():
-            item_id = str(row.get('id', '')).strip()
+            # DataFrame index 0 is the first row after the header (sheet row 2)
+            sheet_row = int(idx) + 2
+            item_id = _cell_to_str(row.get('id', ''))
             
             if not item_id:
-                logger.warning(f"Skipping row {idx}: missing item ID")
+                logger.warning(f"Skipping row {sheet_row}: missing item ID")
                 continue
             
             # Extract SAT fields
             sat_data = {
-                'ClaveProdServ': str(row.get('ClaveProdServ', '')).strip(),
-                'ClaveUnidad': str(row.get('ClaveUnidad', '')).strip(),
-                'Unidad_SAT': str(row.get('Unidad_SAT', '')).strip(),
-                'Descripción_SAT': str(row.get('Descripción_SAT', '')).strip()
+                'ClaveProdServ': _cell_to_str(row.get('ClaveProdServ', '')),
+                'ClaveUnidad': _cell_to_str(row.get('ClaveUnidad', '')),
+                'Unidad_SAT': _cell_to_str(row.get('Unidad_SAT', '')),
+                'Descripción_SAT': _cell_to_str(row.get('Descripción_SAT', ''))
             }
             
             # Check if there's any data to update
@@ -168,10 +213,86 @@ class FileManager:
             if has_data:
                 updates.append({
                     'item_id': item_id,
-                    'sat_data': sat_data
+                    'sat_data': sat_data,
+                    'row': sheet_row
                 })
             else:
                 logger.info(f"Skipping item {item_id}: no SAT data to update")
         
         logger.info(f"Extracted {len(updates)} items to update")
         return updates
+
+    @staticmethod
+    @profile_stage('plan_sat_updates')
+    def plan_sat_updates(updates: List[Dict[str, Any]], run_id: str = '') -> List[Dict[str, Any]]:
+        """
+        Coalesce row updates into one write per item
+        
+        Rows are grouped by item ID (case-insensitive; the ID is written as it
+        appears in the first row) and merged in sheet order: for each SAT field
+        the first non-empty value wins, and later rows only fill fields that
+        are still empty. Rows that disagree on a field are reported as
+        conflicts instead of racing each other on the API.
+        
+        Args:
+            updates: Row updates as returned by extract_sat_updates
+            run_id: Identifier of this upload run; the idempotency key
+                (reused by MeliClient on PUT retries) is scoped to it so a
+                later upload with the same content is not treated as a repeat
+        
+        Returns:
+            List of dicts with item_id, sat_data, idempotency_key, rows and
+            conflicts, one per item, in order of first appearance
+        """
+        plans: Dict[str, Dict[str, Any]] = {}
+        
+        for update in updates:
+            item_id = update['item_id'].strip()
+            key = item_id.upper()
+            row = update.get('row')
+            plan = plans.get(key)
+            
+            if plan is None:
+                plan = {
+                    'item_id': item_id,
+                    'sat_data': {},
+                    'rows': [],
+                    'conflicts': []
+                }
+                plans[key] = plan
+            
+            plan['rows'].append(row)
+            
+            for field, value in update['sat_data'].items():
+                if not value:
+                    plan['sat_data'].setdefault(field, '')
+                    continue
+                
+                current = plan['sat_data'].get(field)
+                if not current:
+                    plan['sat_data'][field] = value
+                elif current != value:
+                    plan['conflicts'].append({
+                        'field': field,
+                        'kept': current,
+                        'ignored': value,
+                        'row': row
+                    })
+        
+        for plan in plans.values():
+            payload = json.dumps(
+                {'run_id': run_id, 'item_id': plan['item_id'], 'sat_data': plan['sat_data']},
+                sort_keys=True,
+                ensure_ascii=False
+            )
+            plan['idempotency_key'] = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+            
+            if plan['conflicts']:
+                fields = ', '.join(sorted({c['field'] for c in plan['conflicts']}))
+                logger.warning(
+                    f"Item {plan['item_id']} has conflicting values across rows {plan['rows']} "
+                    f"for {fields}; keeping first non-empty value"
+                )
+        
+        logger.info(f"Planned {len(plans)} item updates from {len(updates)} rows")
+        return list(plans.values())
@@ -3,10 +3,11 @@ MercadoLibre API Client
 Handles all interactions with the MercadoLibre API
 """
 import os
+import time
 import requests
 from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
-from utils import logger
+from utils import logger, profile_stage
 
 # Load environment variables
 load_dotenv()
@@ -17,6 +18,10 @@ USER_ID = os.getenv("USER_ID")
 # API Base URL
 BASE_URL = "https://api.mercadolibre.com"
 
+# Retry policy for item updates (timeouts, connection errors and 5xx)
+UPDATE_MAX_ATTEMPTS = 3
+UPDATE_RETRY_BACKOFF = 1.0  # seconds, multiplied by the attempt number
+
 
 class MeliClient:
     """Client for MercadoLibre API operations"""
@@ -49,6 +54,7 @@ class MeliClient:
             logger.error(f"Token validation failed: {e}")
             return False
     
+    @profile_stage('get_user_items')
     def get_user_items(self) -> List[str]:
         """
         Get all item IDs for the user
@@ -144,7 +150,9 @@ class MeliClient:
             logger.error(f"Error getting item details for {item_id}: {e}")
             raise
     
-    def update_item_sat_fields(self, item_id: str, sat_data: Dict[str, str]) -> Dict[str, Any]:
+    @profile_stage('update_item_sat_fields')
+    def update_item_sat_fields(self, item_id: str, sat_data: Dict[str, str],
+                               idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         """
         Update SAT fields for a specific item
         
@@ -155,6 +163,12 @@ class MeliClient:
                 - ClaveUnidad
                 - Unidad_SAT
                 - Descripción_SAT
+            idempotency_key: Optional key sent as X-Idempotency-Key on
+                every attempt, so retries of this PUT carry the same key
+                (the items endpoint does not document this header)
+        
+        Timeouts, connection errors and 5xx responses are retried up to
+        UPDATE_MAX_ATTEMPTS times with the same payload and headers.
         
         Returns:
             Dict with update response
@@ -189,11 +203,32 @@ class MeliClient:
             if 'seller_custom_field' in sat_data:
                 payload['seller_custom_field'] = sat_data['seller_custom_field']
             
-            response = requests.put(url, headers=self.headers, json=payload, timeout=30)
-            response.raise_for_status()
+            headers = dict(self.headers)
+            if idempotency_key:
+                headers["X-Idempotency-Key"] = idempotency_key
             
-            logger.info(f"Successfully updated item {item_id}")
-            return response.json()
+            for attempt in range(1, UPDATE_MAX_ATTEMPTS + 1):
+                try:
+                    response = requests.put(url, headers=headers, json=payload, timeout=30)
+                except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                    if attempt == UPDATE_MAX_ATTEMPTS:
+                        raise
+                    logger.warning(f"Attempt {attempt} to update item {item_id} failed: {e}; retrying")
+                    time.sleep(UPDATE_RETRY_BACKOFF * attempt)
+                    continue
+                
+                if response.status_code >= 500 and attempt < UPDATE_MAX_ATTEMPTS:
+                    logger.warning(
+                        f"Attempt {attempt} to update item {item_id} returned "
+                        f"{response.status_code}; retrying"
+                    )
+                    time.sleep(UPDATE_RETRY_BACKOFF * attempt)
+                    continue
+                
+                response.raise_for_status()
+                
+                logger.info(f"Successfully updated item {item_id}")
+                return response.json()
         
         except requests.exceptions.RequestException as e:
             logger.error(f"Error updating item {item_id}: {e}")
@@ -201,6 +236,7 @@ class MeliClient:
                 logger.error(f"Response: {e.response.text}")
             raise
     
+    @profile_stage('get_all_items_details')
     def get_all_items_details(self, item_ids: List[str]) -> List[Dict[str, Any]]:
         """
         Get details for all items
@@ -0,0 +1,141 @@
+"""
+Tests for FileManager upload planning
+"""
+import pandas as pd
+
+from services.file_manager import FileManager
+
+COLUMNS = ['id', 'ClaveProdServ', 'ClaveUnidad', 'Unidad_SAT', 'Descripción_SAT']
+
+
+def make_update(item_id, row, **sat_data):
+    """Build a row update like extract_sat_updates returns"""
+    data = {'ClaveProdServ': '', 'ClaveUnidad': '', 'Unidad_SAT': '', 'Descripción_SAT': ''}
+    data.update(sat_data)
+    return {'item_id': item_id, 'sat_data': data, 'row': row}
+
+
+def test_later_row_fills_empty_fields():
+    updates = [
+        make_update('MLM1', 2, ClaveProdServ='43211500'),
+        make_update('MLM1', 3, ClaveUnidad='H87', Unidad_SAT='Pieza', **{'Descripción_SAT': 'Laptop'}),
+    ]
+
+    plans = FileManager.plan_sat_updates(updates)
+
+    assert len(plans) == 1
+    assert plans[0]['sat_data'] == {
+        'ClaveProdServ': '43211500',
+        'ClaveUnidad': 'H87',
+        'Unidad_SAT': 'Pieza',
+        'Descripción_SAT': 'Laptop'
+    }
+    assert plans[0]['rows'] == [2, 3]
+    assert plans[0]['conflicts'] == []
+
+
+def test_conflict_keeps_first_non_empty_value():
+    updates = [
+        make_update('MLM1', 2, ClaveProdServ='43211500'),
+        make_update('MLM2', 3, ClaveProdServ='10101500'),
+        make_update('MLM1', 4, ClaveProdServ='99999999'),
+    ]
+
+    plans = FileManager.plan_sat_updates(updates)
+
+    assert [plan['item_id'] for plan in plans] == ['MLM1', 'MLM2']
+    assert plans[0]['sat_data']['ClaveProdServ'] == '43211500'
+    assert plans[0]['conflicts'] == [
+        {'field': 'ClaveProdServ', 'kept': '43211500', 'ignored': '99999999', 'row': 4}
+    ]
+
+
+def test_item_id_grouping_ignores_case_but_keeps_original_id():
+    updates = [
+        make_update('MLM1', 2, ClaveProdServ='43211500'),
+        make_update('mlm1', 3, ClaveUnidad='H87'),
+    ]
+
+    plans = FileManager.plan_sat_updates(updates)
+
+    assert len(plans) == 1
+    assert plans[0]['item_id'] == 'MLM1'
+
+
+def test_empty_and_nan_cells_are_treated_as_empty():
+    df = pd.DataFrame([
+        {'id': 'MLM1', 'ClaveProdServ': '43211500', 'ClaveUnidad': None,
+         'Unidad_SAT': float('nan'), 'Descripción_SAT': ''},
+        {'id': 'MLM1', 'ClaveProdServ': float('nan'), 'ClaveUnidad': 'H87',
+         'Unidad_SAT': 'Pieza', 'Descripción_SAT': 'Laptop'},
+        {'id': float('nan'), 'ClaveProdServ': '1', 'ClaveUnidad': '',
+         'Unidad_SAT': '', 'Descripción_SAT': ''},
+    ], columns=COLUMNS)
+
+    updates = FileManager.extract_sat_updates(df)
+    plans = FileManager.plan_sat_updates(updates)
+
+    assert [update['row'] for update in updates] == [2, 3]
+    assert len(plans) == 1
+    assert plans[0]['sat_data'] == {
+        'ClaveProdServ': '43211500',
+        'ClaveUnidad': 'H87',
+        'Unidad_SAT': 'Pieza',
+        'Descripción_SAT': 'Laptop'
+    }
+    assert plans[0]['conflicts'] == []
+
+
+def test_idempotency_key_depends_on_merged_payload_and_run():
+    split_rows = [
+        make_update('MLM1', 2, ClaveProdServ='43211500'),
+        make_update('MLM1', 3, ClaveUnidad='H87'),
+    ]
+    single_row = [make_update('MLM1', 2, ClaveProdServ='43211500', ClaveUnidad='H87')]
+
+    key = FileManager.plan_sat_updates(split_rows, run_id='run-1')[0]['idempotency_key']
+
+    assert FileManager.plan_sat_updates(single_row, run_id='run-1')[0]['idempotency_key'] == key
+    assert FileManager.plan_sat_updates(single_row, run_id='run-2')[0]['idempotency_key'] != key
+    changed = [make_update('MLM1', 2, ClaveProdServ='43211500', ClaveUnidad='E48')]
+    assert FileManager.plan_sat_updates(changed, run_id='run-1')[0]['idempotency_key'] != key
+
+
+def test_uploaded_csv_with_blank_cells_keeps_codes_as_text(tmp_path):
+    path = tmp_path / 'upload.csv'
+    path.write_text(
+        'id,ClaveProdServ,ClaveUnidad,Unidad_SAT,Descripción_SAT\n'
+        'MLM1,43211500,,,\n'
+        'MLM1,01010101,H87,Pieza,Laptop\n',
+        encoding='utf-8-sig'
+    )
+
+    df = FileManager.read_upload_file(str(path))
+    plans = FileManager.plan_sat_updates(FileManager.extract_sat_updates(df))
+
+    assert plans[0]['sat_data'] == {
+        'ClaveProdServ': '43211500',
+        'ClaveUnidad': 'H87',
+        'Unidad_SAT': 'Pieza',
+        'Descripción_SAT': 'Laptop'
+    }
+    assert plans[0]['conflicts'] == [
+        {'field': 'ClaveProdServ', 'kept': '43211500', 'ignored': '01010101', 'row': 3}
+    ]
+
+
+def test_uploaded_xlsx_with_numeric_and_blank_cells_keeps_codes_as_text(tmp_path):
+    path = tmp_path / 'upload.xlsx'
+    pd.DataFrame([
+        {'id': 'MLM1', 'ClaveProdServ': 43211500, 'ClaveUnidad': None,
+         'Unidad_SAT': None, 'Descripción_SAT': None},
+        {'id': 'MLM1', 'ClaveProdServ': None, 'ClaveUnidad': 'H87',
+         'Unidad_SAT': 'Pieza', 'Descripción_SAT': 'Laptop'},
+    ], columns=COLUMNS).to_excel(path, index=False, engine='openpyxl')
+
+    df = FileManager.read_upload_file(str(path))
+    plans = FileManager.plan_sat_updates(FileManager.extract_sat_updates(df))
+
+    assert plans[0]['sat_data']['ClaveProdServ'] == '43211500'
+    assert plans[0]['sat_data']['ClaveUnidad'] == 'H87'
+    assert plans[0]['conflicts'] == []
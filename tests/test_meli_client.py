@@ -0,0 +1,80 @@
+"""
+Tests for MeliClient item updates
+"""
+import pytest
+import requests
+
+from services import meli_client
+from services.meli_client import MeliClient
+
+
+class FakeResponse:
+    """Minimal stand-in for requests.Response"""
+
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.text = ''
+        self._body = body or {}
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} error", response=self)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(meli_client, 'ACCESS_TOKEN', 'token')
+    monkeypatch.setattr(meli_client, 'USER_ID', '123')
+    monkeypatch.setattr(meli_client.time, 'sleep', lambda seconds: None)
+    return MeliClient()
+
+
+def fake_put(monkeypatch, outcomes):
+    """Patch requests.put to return or raise each outcome in turn"""
+    calls = []
+
+    def put(url, headers=None, json=None, timeout=None):
+        calls.append({'url': url, 'headers': dict(headers), 'json': json})
+        outcome = outcomes[len(calls) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(meli_client.requests, 'put', put)
+    return calls
+
+
+def test_retry_reuses_idempotency_key(client, monkeypatch):
+    calls = fake_put(monkeypatch, [
+        requests.exceptions.Timeout('timed out'),
+        FakeResponse(502),
+        FakeResponse(200, {'id': 'MLM1'}),
+    ])
+
+    result = client.update_item_sat_fields('MLM1', {'ClaveProdServ': '43211500'}, idempotency_key='key-1')
+
+    assert result == {'id': 'MLM1'}
+    assert len(calls) == 3
+    assert [call['headers']['X-Idempotency-Key'] for call in calls] == ['key-1'] * 3
+    assert all(call['json'] == calls[0]['json'] for call in calls)
+
+
+def test_client_errors_are_not_retried(client, monkeypatch):
+    calls = fake_put(monkeypatch, [FakeResponse(400)])
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.update_item_sat_fields('MLM1', {'ClaveProdServ': '43211500'}, idempotency_key='key-1')
+
+    assert len(calls) == 1
+
+
+def test_retries_are_bounded(client, monkeypatch):
+    calls = fake_put(monkeypatch, [FakeResponse(503)] * meli_client.UPDATE_MAX_ATTEMPTS)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.update_item_sat_fields('MLM1', {'ClaveProdServ': '43211500'}, idempotency_key='key-1')
+
+    assert len(calls) == meli_client.UPDATE_MAX_ATTEMPTS
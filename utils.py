@@ -1,9 +1,16 @@
 """
 Utility functions for the Meli SAT Manager
 """
+import cProfile
+import functools
 import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterator, Optional
 
 # Configure logging
 logging.basicConfig(
@@ -17,6 +24,14 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Per-request timing state, set by stage_timer()
+_stage_timings: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
+    'stage_timings', default=None
+)
+
+# cProfile hooks are per thread, so only one request can be profiled at a time
+_profiler_lock = threading.Lock()
+
 
 def log_update(item_id: str, status: str, message: str = "") -> Dict[str, Any]:
     """
@@ -98,3 +113,154 @@ def format_success_response(message: str, data: Any = None) -> Dict[str, Any]:
         response['data'] = data
     
     return response
+
+
+@contextmanager
+def stage_timer() -> Iterator[Dict[str, Any]]:
+    """
+    Collect stage timings for the current request
+    
+    Every timed_stage (or profile_stage decorated function) executed inside
+    this block is accumulated into the current report, see timing_report().
+    
+    Yields:
+        Dict with the request start time, the stages mapping stage name to
+        {'seconds': total, 'calls': count}, and the profile file name
+    """
+    report: Dict[str, Any] = {
+        'start': time.perf_counter(),
+        'stages': {},
+        'profile_file': None
+    }
+    token = _stage_timings.set(report)
+    try:
+        yield report
+    finally:
+        _stage_timings.reset(token)
+
+
+def timing_report() -> Optional[Dict[str, Any]]:
+    """
+    Build the per-stage timing report for the current request
+    
+    Returns:
+        Dict with total time, per-stage breakdown and profile file name
+        (if any), or None when called outside stage_timer()
+    """
+    report = _stage_timings.get()
+    if report is None:
+        return None
+    
+    result = {
+        'total_seconds': round(time.perf_counter() - report['start'], 6),
+        'stages': report['stages']
+    }
+    if report['profile_file']:
+        result['profile_file'] = report['profile_file']
+    return result
+
+
+@contextmanager
+def timed_stage(name: str) -> Iterator[None]:
+    """
+    Time a block of code as a named stage
+    
+    Args:
+        name: Stage name used in the timing report
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        report = _stage_timings.get()
+        if report is not None:
+            stage = report['stages'].setdefault(name, {'seconds': 0.0, 'calls': 0})
+            stage['seconds'] = round(stage['seconds'] + elapsed, 6)
+            stage['calls'] += 1
+        logger.debug(f"Stage {name} took {elapsed:.4f}s")
+
+
+def profile_stage(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorator that times every call of a function as a named stage
+    
+    Args:
+        name: Stage name used in the timing report
+    
+    Returns:
+        Decorator
+    """
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with timed_stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def profiling_enabled() -> bool:
+    """
+    Check whether request profiling is allowed on this server
+    
+    Returns:
+        True if ENABLE_PROFILING is set to a truthy value
+    """
+    return os.getenv("ENABLE_PROFILING", "").strip().lower() in ("1", "true", "yes")
+
+
+@contextmanager
+def request_profiler(enabled: bool, label: str) -> Iterator[Optional[str]]:
+    """
+    Capture a cProfile dump for a single request
+    
+    Profiling must be allowed with ENABLE_PROFILING and only one request is
+    profiled at a time; otherwise the request runs without a profiler. The
+    dump is written to PROFILE_DIR (default: /tmp) and can be inspected with
+    pstats or snakeviz.
+    
+    Args:
+        enabled: Whether profiling was requested
+        label: Label used in the output filename
+    
+    Yields:
+        File name of the profile dump, or None when not profiling
+    """
+    if not enabled:
+        yield None
+        return
+    
+    if not profiling_enabled():
+        logger.warning("Profiling requested but ENABLE_PROFILING is not set; skipping")
+        yield None
+        return
+    
+    if not _profiler_lock.acquire(blocking=False):
+        logger.warning(f"Profiler busy with another request; not profiling {label}")
+        yield None
+        return
+    
+    try:
+        filename = f"profile_{label}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.prof"
+        filepath = os.path.join(os.getenv("PROFILE_DIR", "/tmp"), filename)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Another profiler or tool already owns the profiling hook
+            logger.warning(f"Could not start profiler for {label}: {e}")
+            yield None
+            return
+        
+        try:
+            yield filename
+        finally:
+            profiler.disable()
+            try:
+                profiler.dump_stats(filepath)
+                logger.info(f"Profile written to {filepath}")
+            except OSError as e:
+                logger.error(f"Failed to write profile {filepath}: {e}")
+    finally:
+        _profiler_lock.release()